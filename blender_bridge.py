@@ -1,10 +1,26 @@
 import bpy
 import re
 import json
+import logging
 import os
 from datetime import datetime
 import time
+import queue
+import socket
+import threading
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
+import numpy as np
+try:
+    import orjson
+except ImportError: # orjson is optional; stdlib json handles the same payloads
+    orjson = None
+
+# Per-request output goes through logging, silent below WARNING unless configured;
+# console writes in Blender cost far more than the morphs themselves
+logger = logging.getLogger(__name__)
 
 # =============================================================================
 # --- NLP AND SEMANTIC MAPPING ---
@@ -114,6 +130,8 @@ GENDER_KEYWORDS = {
     "male": ["man", "male", "boy", "gentleman", "guy", "dude", "he", "him", "his"],
     "female": ["woman", "female", "girl", "lady", "gal", "she", "her", "hers"]
 }
+# Inverted gender lookup so each word costs one hash instead of two list scans
+_WORD_TO_GENDER = {word: gender for gender, words in GENDER_KEYWORDS.items() for word in words}
 # =============================================================================
 # --- ENHANCED CONFIGURATION ---
 # =============================================================================
@@ -181,294 +199,531 @@ FEATURE_MAP = {
         "pointed": "L2__Fantasy_EarsPointed_max"
     }
 }
+ETHNICITIES = frozenset(CONCEPT_MAP.values()) | {DEFAULT_ETHNICITY}
+def _resolve_feature_map() -> Dict[Tuple[str, str, str], Tuple[str, ...]]:
+    """Flatten FEATURE_MAP to (feature, modifier, ethnicity) -> concrete shape key names."""
+    resolved = {}
+    for feature, modifiers in FEATURE_MAP.items():
+        for modifier, templates in modifiers.items():
+            if isinstance(templates, str):
+                templates = [templates]
+            for ethnicity in ETHNICITIES:
+                resolved[(feature, modifier, ethnicity)] = tuple(
+                    t.format(ethnicity=ethnicity) for t in templates
+                )
+    return resolved
+# Filled in ahead of time, so request-time lookups need no string formatting
+# and no str-vs-list check
+RESOLVED_FEATURES = _resolve_feature_map()
 INTENSITY_MAP = {
     "slightly": 0.3, "somewhat": 0.5, "moderately": 0.6,
     "very": 0.8, "extremely": 0.9, "incredibly": 1.0
 }
 DEFAULT_VALUE = 0.7
 # =============================================================================
+# --- KEYWORD INDEX ---
+# =============================================================================
+def _build_keyword_index() -> Dict[str, Dict[str, object]]:
+    """Compile the keyword tables into one map of keyword -> {category: payload}."""
+    tables = (
+        ("ethnicity", CONCEPT_MAP),
+        ("gender", _WORD_TO_GENDER),
+        ("trait", CONTEXTUAL_FEATURES),
+        ("trait", PERSONALITY_TO_FEATURES), # Personality wins over context on a clash
+        ("age", AGE_MAPPINGS),
+        ("feature", FEATURE_MAP),
+        ("intensity", INTENSITY_MAP)
+    )
+    index = {}
+    for category, table in tables:
+        for keyword, payload in table.items():
+            index.setdefault(keyword, {})[category] = payload
+    return index
+# Built once at import so each token costs a single hash lookup at request time
+_KEYWORD_INDEX = _build_keyword_index()
+_NO_ENTRY: Dict[str, object] = {}
+def _build_trait_changes() -> Dict[Tuple[str, str], List[Tuple[str, float]]]:
+    """Flatten every trait into its (shape_key, value) list for each ethnicity."""
+    trait_changes = {}
+    for ethnicity in ETHNICITIES:
+        for trait, entry in _KEYWORD_INDEX.items():
+            trait_features = entry.get("trait")
+            if trait_features is None:
+                continue
+            flat = []
+            for feature_part, modifiers in trait_features.items():
+                if feature_part == "overall":
+                    continue # Skip overall descriptors for now
+                for modifier, mod_intensity in modifiers.items():
+                    shape_keys = RESOLVED_FEATURES.get((feature_part, modifier, ethnicity), ())
+                    flat.extend((final_key, mod_intensity) for final_key in shape_keys)
+            trait_changes[(trait, ethnicity)] = flat
+    return trait_changes
+# Trait mapping evaluated against the fixed tables ahead of time
+_TRAIT_CHANGES = _build_trait_changes()
+# =============================================================================
 # --- NLP PROCESSING FUNCTIONS ---
 # =============================================================================
-def extract_keywords(prompt: str) -> List[str]:
-    """Extract meaningful keywords from the prompt."""
-    # Remove common stop words but keep descriptive ones
-    stop_words = {'a', 'an', 'the', 'of', 'with', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'from'}
-    words = re.findall(r'\b\w+(?:-\w+)?\b', prompt.lower())
-    return [word for word in words if word not in stop_words]
-def apply_synonyms(words: List[str]) -> List[str]:
-    """Replace words with their canonical forms using synonym mapping."""
-    return [SYNONYM_MAP.get(word, word) for word in words]
-def detect_personality_traits(words: List[str]) -> Dict[str, float]:
-    """Detect personality traits and map them to facial features."""
-    detected_traits = {}
-    
-    for word in words:
-        if word in PERSONALITY_TO_FEATURES:
-            detected_traits[word] = 1.0
-        # Also check for contextual professions/roles
-        elif word in CONTEXTUAL_FEATURES:
-            detected_traits[word] = 1.0
-            
-    return detected_traits
+_WORD_RE = re.compile(r'\b\w+(?:-\w+)?\b')
+# Common stop words to drop; descriptive words are kept
+_STOP_WORDS = frozenset({'a', 'an', 'the', 'of', 'with', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'from'})
 def map_traits_to_features(traits: Dict[str, float], detected_ethnicity: str) -> Dict[str, float]:
     """Convert personality traits to specific shape key modifications."""
     changes = {}
     
     for trait, intensity in traits.items():
-        if trait in PERSONALITY_TO_FEATURES:
-            trait_features = PERSONALITY_TO_FEATURES[trait]
-        elif trait in CONTEXTUAL_FEATURES:
-            trait_features = CONTEXTUAL_FEATURES[trait]
+        trait_changes = _TRAIT_CHANGES.get((trait, detected_ethnicity), ())
+        if intensity == 1.0:
+            changes.update(trait_changes) # Prebuilt values are already final
         else:
-            continue
-            
-        for feature_part, modifiers in trait_features.items():
-            if feature_part == "overall":
-                continue # Skip overall descriptors for now
-                
-            if feature_part in FEATURE_MAP:
-                for modifier, mod_intensity in modifiers.items():
-                    if modifier in FEATURE_MAP[feature_part]:
-                        shape_key_template = FEATURE_MAP[feature_part][modifier]
-                        if isinstance(shape_key_template, list):
-                            for template in shape_key_template:
-                                final_key = template.format(ethnicity=detected_ethnicity)
-                                changes[final_key] = mod_intensity * intensity
-                        else:
-                            final_key = shape_key_template.format(ethnicity=detected_ethnicity)
-                            changes[final_key] = mod_intensity * intensity
+            changes.update((shape_key, value * intensity) for shape_key, value in trait_changes)
     
     return changes
-def smart_prompt_analysis(prompt: str) -> Dict:
-    """Main NLP analysis function."""
-    keywords = extract_keywords(prompt)
-    keywords = apply_synonyms(keywords)
-    
-    # Detect basic demographics
-    detected_ethnicity = DEFAULT_ETHNICITY
-    for keyword in keywords:
-        if keyword in CONCEPT_MAP:
-            detected_ethnicity = CONCEPT_MAP[keyword]
-            break
-    
-    # Detect gender
-    detected_gender = DEFAULT_GENDER
-    for word in keywords:
-        if word in GENDER_KEYWORDS["female"]:
-            detected_gender = "female"
-            break
-        elif word in GENDER_KEYWORDS["male"]:
-            detected_gender = "male"
-            break
-    
-    # Detect personality traits
-    personality_traits = detect_personality_traits(keywords)
-    
-    # Detect age-related descriptors
+@dataclass(frozen=True, slots=True)
+class Analysis:
+    """Result of analysing a prompt; frozen because cached instances are shared."""
+    ethnicity: str
+    gender: str
+    personality_traits: Tuple[Tuple[str, float], ...]
+    age_features: Tuple[Tuple[str, Tuple[Tuple[str, float], ...]], ...]
+    all_keywords: Tuple[str, ...]
+    feature_changes: Tuple[Tuple[str, float], ...]
+@functools.lru_cache(maxsize=256)
+def smart_prompt_analysis(prompt: str) -> Analysis:
+    """Main NLP analysis function. Results are cached per prompt."""
+    # Extract meaningful keywords and replace them with their canonical forms
+    keywords = [SYNONYM_MAP.get(word, word) for word in _WORD_RE.findall(prompt.lower()) if word not in _STOP_WORDS]
+    
+    # Detect demographics, personality traits, age descriptors and
+    # "[intensity] modifier feature" phrases in one walk over the index
+    detected_ethnicity = None
+    detected_gender = None
+    personality_traits = {}
     age_features = {}
+    feature_hits = []
+    prev2 = prev1 = None
     for keyword in keywords:
-        if keyword in AGE_MAPPINGS:
-            age_features.update(AGE_MAPPINGS[keyword])
-    
-    analysis_result = {
-        "ethnicity": detected_ethnicity,
-        "gender": detected_gender,
-        "personality_traits": personality_traits,
-        "age_features": age_features,
-        "all_keywords": keywords
-    }
+        entry = _KEYWORD_INDEX.get(keyword)
+        if entry is not None:
+            # The first ethnicity and gender mentioned win
+            if detected_ethnicity is None and "ethnicity" in entry:
+                detected_ethnicity = entry["ethnicity"]
+            if detected_gender is None and "gender" in entry:
+                detected_gender = entry["gender"]
+            # Personality traits and contextual professions/roles share the "trait" slot
+            if "trait" in entry:
+                personality_traits[keyword] = 1.0
+            if "age" in entry:
+                age_features.update(entry["age"])
+            feature_modifiers = entry.get("feature")
+            if feature_modifiers is not None and prev1 in feature_modifiers:
+                value = _KEYWORD_INDEX.get(prev2, _NO_ENTRY).get("intensity", DEFAULT_VALUE)
+                feature_hits.append((keyword, prev1, value))
+        prev2, prev1 = prev1, keyword
+    if detected_ethnicity is None:
+        detected_ethnicity = DEFAULT_ETHNICITY
+    if detected_gender is None:
+        detected_gender = DEFAULT_GENDER
+    
+    # Resolve feature phrases only now, since the ethnicity may be named after them
+    feature_changes = {}
+    for feature, modifier, value in feature_hits:
+        feature_changes.update(dict.fromkeys(RESOLVED_FEATURES[(feature, modifier, detected_ethnicity)], value))
+    
+    analysis_result = Analysis(
+        ethnicity=detected_ethnicity,
+        gender=detected_gender,
+        personality_traits=tuple(personality_traits.items()),
+        age_features=tuple((part, tuple(mods.items())) for part, mods in age_features.items()),
+        all_keywords=tuple(keywords),
+        feature_changes=tuple(feature_changes.items())
+    )
     
     return analysis_result
 # =============================================================================
 # --- BLENDER HELPER FUNCTIONS ---
 # =============================================================================
+# Resolved object name per base name, so repeat lookups skip the scene scan
+_OBJ_NAME_CACHE: Dict[str, str] = {}
 def get_object(name="mb_male"):
     """Safely gets the character object from the scene."""
-    for obj in bpy.data.objects:
-        if obj.name.startswith(name):
+    cached_name = _OBJ_NAME_CACHE.get(name)
+    if cached_name is not None:
+        obj = bpy.data.objects.get(cached_name)
+        if obj is not None:
             return obj
-    return None
+        del _OBJ_NAME_CACHE[name]
+    # Exact names resolve through Blender's own lookup; only fall back to a
+    # prefix scan for suffixed duplicates such as "mb_male.001"
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        obj = next((o for o in bpy.data.objects if o.name.startswith(name)), None)
+    if obj is not None:
+        _OBJ_NAME_CACHE[name] = obj.name
+    return obj
+# Shape-key value buffers keyed by the Key datablock pointer (the Python wrapper
+# objects are recreated on every access, so id() would not be stable). float32
+# matches the RNA "value" property, letting foreach_get/foreach_set copy directly.
+_BUF_CACHE: Dict[int, np.ndarray] = {}
+def _get_buf(shape_keys):
+    """Returns a reusable float32 buffer sized to the given shape keys."""
+    key = shape_keys.as_pointer()
+    n = len(shape_keys.key_blocks)
+    buf = _BUF_CACHE.get(key)
+    if buf is None or buf.size != n:
+        buf = np.empty(n, dtype=np.single)
+        _BUF_CACHE[key] = buf
+    return buf
+# {shape key name: index} per Key datablock, with a cheap layout signature
+# (count plus first/last name) so it is only rebuilt when keys are added or removed
+_NAME_IDX_CACHE: Dict[int, Tuple[Tuple[int, str, str], Dict[str, int]]] = {}
+def _layout_signature(shape_keys) -> Tuple[int, str, str]:
+    """Cheap fingerprint of the shape key layout: count plus first and last name."""
+    kbs = shape_keys.key_blocks
+    n = len(kbs)
+    return (n, kbs[0].name, kbs[-1].name) if n else (0, "", "")
+def _get_name_index(shape_keys):
+    """Returns a cached {name: index} map for the given shape keys."""
+    kbs = shape_keys.key_blocks
+    signature = _layout_signature(shape_keys)
+    key = shape_keys.as_pointer()
+    entry = _NAME_IDX_CACHE.get(key)
+    if entry is None or entry[0] != signature:
+        entry = (signature, {name: i for i, name in enumerate(kbs.keys())})
+        _NAME_IDX_CACHE[key] = entry
+    return entry[1]
 def reset_character_shape_keys(obj):
     """Resets all shape key values to 0.0 for a clean start."""
     if not obj or not getattr(obj.data, "shape_keys", None):
         return
-    print("--- Resetting all shape keys ---")
-    for kb in obj.data.shape_keys.key_blocks:
-        kb.value = 0.0
-    print("Reset complete.")
+    logger.debug("Resetting all shape keys")
+    shape_keys = obj.data.shape_keys
+    kbs = shape_keys.key_blocks
+    buf = _get_buf(shape_keys)
+    buf.fill(0.0)
+    kbs.foreach_set("value", buf)
+    # foreach_set skips RNA update callbacks, so tag the shape keys for re-evaluation
+    shape_keys.update_tag()
+    logger.debug("Reset complete (%d shape keys)", len(kbs))
 def apply_morph(obj, shape_key_name, value):
     """Applies a single morph value, checking if the key exists."""
     if not obj or not getattr(obj.data, "shape_keys", None):
         return
-    if shape_key_name in obj.data.shape_keys.key_blocks:
-        print(f"Applying morph: '{shape_key_name}' with value {value:.2f}")
-        obj.data.shape_keys.key_blocks[shape_key_name].value = min(1.0, value)
+    shape_keys = obj.data.shape_keys
+    i = _get_name_index(shape_keys).get(shape_key_name)
+    if i is not None:
+        logger.debug("Applying morph: '%s' with value %.2f", shape_key_name, value)
+        shape_keys.key_blocks[i].value = min(1.0, value)
     else:
-        print(f"Warning: Shape key '{shape_key_name}' not found.")
+        logger.warning("Shape key '%s' not found.", shape_key_name)
+def apply_morphs(obj, changes, reset=False):
+    """Applies a batch of morph values with one foreach_get/foreach_set round trip.
+    
+    With reset=True every other shape key is zeroed in the same write, so no read is needed.
+    """
+    if not obj or not getattr(obj.data, "shape_keys", None):
+        return
+    # Each obj.data.shape_keys access builds new RNA wrappers, so resolve it once
+    shape_keys = obj.data.shape_keys
+    kbs = shape_keys.key_blocks
+    name_to_idx = _get_name_index(shape_keys)
+    vals = _get_buf(shape_keys)
+    if reset:
+        vals.fill(0.0)
+    else:
+        kbs.foreach_get("value", vals)
+    # Resolve names to indices once, then clamp and scatter all values in one numpy step
+    idx = np.fromiter((name_to_idx.get(name, -1) for name in changes), dtype=np.intp, count=len(changes))
+    values = np.fromiter(changes.values(), dtype=np.single, count=len(changes))
+    found = idx >= 0
+    vals[idx[found]] = np.minimum(values[found], 1.0)
+    kbs.foreach_set("value", vals)
+    shape_keys.update_tag()
+    if logger.isEnabledFor(logging.DEBUG):
+        for shape_key_name, value, ok in zip(changes, values, found):
+            if ok:
+                logger.debug("Applying morph: '%s' with value %.2f", shape_key_name, value)
+    logger.debug("Applied %d morphs", int(found.sum()))
+    if not found.all():
+        missing = [name for name, ok in zip(changes, found) if not ok]
+        logger.warning("%d shape keys not found: %s", len(missing), ", ".join(missing))
+# Final shape-key vectors of recently generated prompts, least recently used first.
+# Keyed on the normalized prompt plus the Key datablock and its layout, so a
+# resubmitted prompt is a single foreach_set with no parsing or morph resolution
+MORPH_CACHE_SIZE = 256
+_MORPH_CACHE: "OrderedDict[Tuple[str, int, Tuple[int, str, str]], np.ndarray]" = OrderedDict()
+def _morph_cache_key(prompt: str, shape_keys):
+    """Builds the _MORPH_CACHE key for a prompt applied to the given shape keys."""
+    return (prompt.lower().strip(), shape_keys.as_pointer(), _layout_signature(shape_keys))
+def _remember_morphs(cache_key, shape_keys):
+    """Stores the vector just written to the shape keys under cache_key."""
+    _MORPH_CACHE[cache_key] = _get_buf(shape_keys).copy()
+    _MORPH_CACHE.move_to_end(cache_key)
+    if len(_MORPH_CACHE) > MORPH_CACHE_SIZE:
+        _MORPH_CACHE.popitem(last=False)
+@bpy.app.handlers.persistent
+def _clear_scene_caches(*_args):
+    """Drops cached lookups when a new .blend file is loaded."""
+    _OBJ_NAME_CACHE.clear()
+    # Datablock pointers from the old file may be reused by the new one
+    _BUF_CACHE.clear()
+    _NAME_IDX_CACHE.clear()
+    _MORPH_CACHE.clear()
 # =============================================================================
 # --- MAIN ENHANCED PROCESSING FUNCTION ---
 # =============================================================================
-def process_and_apply_smart_prompt(prompt: str, character_obj):
-    """Enhanced prompt processing with NLP capabilities."""
-    print(f"Processing prompt: '{prompt}'")
-    
-    reset_character_shape_keys(character_obj)
-    
+@functools.lru_cache(maxsize=256)
+def resolve_prompt_morphs(prompt: str) -> Tuple[Tuple[str, float], ...]:
+    """Resolve a prompt to its (shape_key, value) changes. Results are cached per prompt."""
     # Step 1: Smart analysis
     analysis = smart_prompt_analysis(prompt)
-    print(f"Analysis result: {analysis}")
+    logger.debug("Analysis result: %s", analysis)
     
     changes_to_apply = {}
     
     # Step 2: Apply ethnicity
-    ethnicity = analysis["ethnicity"]
+    ethnicity = analysis.ethnicity
     if ethnicity != DEFAULT_ETHNICITY:
         ethnicity_key = f"L1_{ethnicity}"
         changes_to_apply[ethnicity_key] = 1.0
     
     # Step 3: Apply personality-based features
-    personality_changes = map_traits_to_features(analysis["personality_traits"], ethnicity)
+    personality_changes = map_traits_to_features(dict(analysis.personality_traits), ethnicity)
     changes_to_apply.update(personality_changes)
     
-    # Step 4: Process remaining keywords using original logic
-    words = analysis["all_keywords"]
-    for i, word in enumerate(words):
-        if word in FEATURE_MAP:
-            if i > 0:
-                modifier = words[i-1]
-                if modifier in FEATURE_MAP[word]:
-                    value = DEFAULT_VALUE
-                    
-                    # Check for intensity
-                    if i > 1 and words[i-2] in INTENSITY_MAP:
-                        value = INTENSITY_MAP[words[i-2]]
-                    
-                    shape_key_templates = FEATURE_MAP[word][modifier]
-                    if not isinstance(shape_key_templates, list):
-                        shape_key_templates = [shape_key_templates]
-                    
-                    for template in shape_key_templates:
-                        final_key = template.format(ethnicity=ethnicity)
-                        changes_to_apply[final_key] = value
-    
-    # Step 5: Apply all changes
-    print("\n--- Applying detected changes ---")
+    # Step 4: Apply explicit "[intensity] modifier feature" phrases found by the analysis
+    changes_to_apply.update(analysis.feature_changes)
+    
+    return tuple(changes_to_apply.items())
+def process_and_apply_smart_prompt(prompt: str, character_obj, reset: bool = True):
+    """Enhanced prompt processing with NLP capabilities.
+    
+    With reset=False the morphs are layered onto the character's current shape
+    instead of starting from the base mesh (incremental batch morphing).
+    """
+    logger.debug("Processing prompt: '%s'", prompt)
+    
+    # A from-scratch morph of a prompt seen before is fully determined by the prompt,
+    # so write the remembered vector back instead of recomputing it
+    cache_key = None
+    if reset and character_obj and getattr(character_obj.data, "shape_keys", None):
+        shape_keys = character_obj.data.shape_keys
+        cache_key = _morph_cache_key(prompt, shape_keys)
+        cached = _MORPH_CACHE.get(cache_key)
+        if cached is not None:
+            _MORPH_CACHE.move_to_end(cache_key)
+            shape_keys.key_blocks.foreach_set("value", cached)
+            shape_keys.update_tag()
+            logger.info("Reused cached morphs for prompt '%s'", prompt)
+            return
+    
+    # Parsing is pure in the prompt and cached; only applying touches the scene
+    changes_to_apply = dict(resolve_prompt_morphs(prompt))
+    
+    # Apply all changes
     if not changes_to_apply:
-        print("No features detected. Applying default character.")
+        logger.info("No features detected. Applying default character.")
+        if reset:
+            reset_character_shape_keys(character_obj)
+        if cache_key is not None:
+            _remember_morphs(cache_key, shape_keys)
         return
     
-    for shape_key, value in changes_to_apply.items():
-        apply_morph(character_obj, shape_key, value)
-    
-    bpy.context.view_layer.update()
-    print("--- Smart character generation complete! ---")
+    # Reset and apply in one foreach_set. Shape keys are tagged for re-evaluation;
+    # the depsgraph picks them up on the next redraw instead of a full view layer update
+    apply_morphs(character_obj, changes_to_apply, reset=reset)
+    if cache_key is not None:
+        _remember_morphs(cache_key, shape_keys)
+    logger.info("Applied %d morphs for prompt '%s'", len(changes_to_apply), prompt)
 # =============================================================================
 # BLENDER BRIDGE CONFIGURATION
 # =============================================================================
-# Communication directory (CHANGE THIS PATH TO MATCH YOUR FRONTEND!)
-COMMUNICATION_DIR = r"D:\sem\char-morphing-scripts\blender_bridge" # Windows
-# COMMUNICATION_DIR = "/tmp/blender_bridge" # macOS/Linux
-REQUEST_FILE = os.path.join(COMMUNICATION_DIR, "character_request.json")
-RESPONSE_FILE = os.path.join(COMMUNICATION_DIR, "character_response.json")
+# Loopback address the frontend connects to (CHANGE THIS TO MATCH YOUR FRONTEND!)
+BRIDGE_HOST = "127.0.0.1"
+BRIDGE_PORT = 5055
+# Prompt the frontend sends to check that the bridge is alive
+STATUS_CHECK_PROMPT = "__STATUS_CHECK__"
+DRAIN_INTERVAL = 0.05 # Seconds between request-queue drains on the main thread
 # Global variable to control the monitoring loop
 is_monitoring = False
+# Listening socket, open frontend connections, and the queue their reader
+# threads feed; RNA access must stay on the main thread, so the threads only queue
+_server = None
+_clients = set()
+_request_queue = queue.Queue()
+def _encode_message(data) -> bytes:
+    """Serialize one newline-terminated JSON message, using orjson when available."""
+    payload = orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+    return payload + b"\n"
+def _decode_message(line: bytes):
+    """Parse one JSON message, using orjson when available."""
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+def _accept_connections(server):
+    """Accept frontend connections until monitoring stops."""
+    while is_monitoring:
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        except OSError:
+            return # Listening socket was closed
+        conn.settimeout(None)
+        _clients.add(conn)
+        threading.Thread(target=_read_requests, args=(conn,), daemon=True).start()
+def _read_requests(conn):
+    """Queue every newline-delimited request received on one connection."""
+    try:
+        with conn.makefile('rb') as stream:
+            for line in stream:
+                if line.strip():
+                    _request_queue.put((conn, line))
+    except OSError:
+        pass # Connection dropped
+    finally:
+        _clients.discard(conn)
 def start_bridge_monitoring():
     """Start monitoring for character generation requests."""
-    global is_monitoring
+    global is_monitoring, _server
     
     if is_monitoring:
         print("Bridge monitoring is already active.")
         return
     
-    # Ensure communication directory exists
-    os.makedirs(COMMUNICATION_DIR, exist_ok=True)
-    
     print(f"Starting Blender Bridge monitoring...")
-    print(f"Watching directory: {COMMUNICATION_DIR}")
+    _server = socket.create_server((BRIDGE_HOST, BRIDGE_PORT))
+    # Wake up periodically so the accept thread notices when monitoring stops
+    _server.settimeout(1.0)
+    print(f"Listening on {BRIDGE_HOST}:{BRIDGE_PORT}")
     print("Waiting for character generation requests...")
     
     is_monitoring = True
     
-    # Register timer to check for requests every 0.5 seconds
-    bpy.app.timers.register(check_for_requests, first_interval=0.5)
+    threading.Thread(target=_accept_connections, args=(_server,), daemon=True).start()
+    # Register timer to answer queued requests on the main thread
+    bpy.app.timers.register(check_for_requests, first_interval=DRAIN_INTERVAL)
 def stop_bridge_monitoring():
     """Stop monitoring for requests."""
-    global is_monitoring
+    global is_monitoring, _server
     is_monitoring = False
     
+    # Close the listening socket and any open frontend connections
+    if _server is not None:
+        _server.close()
+        _server = None
+    for conn in list(_clients):
+        try:
+            conn.shutdown(socket.SHUT_RDWR) # Wakes the reader thread blocked on it
+        except OSError:
+            pass
+        conn.close()
+    _clients.clear()
+    
     # Unregister the timer
     if bpy.app.timers.is_registered(check_for_requests):
         bpy.app.timers.unregister(check_for_requests)
     
     print("Bridge monitoring stopped.")
+def handle_request(request_data) -> Dict:
+    """Generate the character(s) for one request and build its response."""
+    if 'batch' in request_data:
+        # Every prompt runs in this one timer tick; with "incremental" each
+        # prompt morphs on top of the previous one instead of the base mesh
+        reset = not request_data.get('incremental', False)
+        logger.info("Received batch of %d prompts", len(request_data['batch']))
+        results = []
+        for prompt in request_data['batch']:
+            # A failing prompt gets its own error entry; the rest of the batch still runs
+            try:
+                results.append(generate_character(prompt, reset))
+            except Exception as e:
+                logger.exception("Error processing batch prompt %r", prompt)
+                results.append({
+                    "timestamp": datetime.now().isoformat(),
+                    "prompt": prompt,
+                    "status": "error",
+                    "message": f"Error: {str(e)}"
+                })
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "status": "completed",
+            "results": results
+        }
+    
+    prompt = request_data['prompt']
+    if prompt == STATUS_CHECK_PROMPT:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "status": "ready",
+            "message": "Blender bridge is running."
+        }
+    
+    logger.info("Received request: %s", prompt)
+    return generate_character(prompt)
+def generate_character(prompt: str, reset: bool = True) -> Dict:
+    """Morph the character matching the prompt's gender and build the response for it."""
+    # Perform analysis to detect gender
+    analysis = smart_prompt_analysis(prompt)
+    gender = analysis.gender
+    
+    # Select the appropriate character based on gender
+    if gender == "female":
+        char_name = "mb_female"
+    else:
+        char_name = "mb_male"
+    
+    character = get_object(char_name)
+    
+    if character:
+        # Use the enhanced NLP function
+        process_and_apply_smart_prompt(prompt, character, reset)
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "prompt": prompt,
+            "status": "completed",
+            "message": "Character generated successfully in Blender!"
+        }
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "prompt": prompt,
+        "status": "error",
+        "message": f"Could not find character object for {gender} in Blender scene."
+    }
 def check_for_requests():
-    """Timer function that checks for new character requests."""
+    """Timer function that answers queued character requests."""
     global is_monitoring
     
     if not is_monitoring:
         return None # Stop the timer
     
-    try:
-        if os.path.exists(REQUEST_FILE):
-            # Read the request
-            with open(REQUEST_FILE, 'r') as f:
-                request_data = json.load(f)
-            
-            print(f"Received request: {request_data['prompt']}")
-            
-            # Perform analysis to detect gender
-            analysis = smart_prompt_analysis(request_data['prompt'])
-            gender = analysis.get("gender", DEFAULT_GENDER)
-            
-            # Select the appropriate character based on gender
-            if gender == "female":
-                char_name = "mb_female"
-            else:
-                char_name = "mb_male"
-            
-            character = get_object(char_name)
-            
-            if character:
-                # Use the enhanced NLP function
-                process_and_apply_smart_prompt(request_data['prompt'], character)
-                
-                response_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "prompt": request_data['prompt'],
-                    "status": "completed",
-                    "message": "Character generated successfully in Blender!"
-                }
-            else:
-                response_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "prompt": request_data['prompt'],
-                    "status": "error",
-                    "message": f"Could not find character object for {gender} in Blender scene."
-                }
-            
-            # Send response
-            with open(RESPONSE_FILE, 'w') as f:
-                json.dump(response_data, f)
-            
-            # Remove request file
-            os.remove(REQUEST_FILE)
-            
-    except Exception as e:
-        print(f"Error processing request: {e}")
-        # Send error response
-        error_response = {
-            "timestamp": datetime.now().isoformat(),
-            "status": "error",
-            "message": f"Error: {str(e)}"
-        }
-        with open(RESPONSE_FILE, 'w') as f:
-            json.dump(error_response, f)
+    # Answer everything queued since the last tick, then flush each
+    # connection's responses with a single write
+    pending = {}
+    while True:
+        try:
+            conn, line = _request_queue.get_nowait()
+        except queue.Empty:
+            break
         
-        # Try to remove request file
-        if os.path.exists(REQUEST_FILE):
-            os.remove(REQUEST_FILE)
-    
-    return 0.5 # Continue checking every 0.5 seconds
+        try:
+            response_data = handle_request(_decode_message(line))
+        except Exception as e:
+            logger.exception("Error processing request")
+            response_data = {
+                "timestamp": datetime.now().isoformat(),
+                "status": "error",
+                "message": f"Error: {str(e)}"
+            }
+        pending.setdefault(conn, []).append(_encode_message(response_data))
+    
+    # Send responses; each connection's replies stay in request order
+    for conn, messages in pending.items():
+        try:
+            conn.sendall(b"".join(messages))
+        except OSError as e:
+            logger.warning("Could not send response: %s", e)
+    
+    return DRAIN_INTERVAL # Continue checking
 # =============================================================================
 # BLENDER UI PANEL (Optional - adds buttons to Blender UI)
 # =============================================================================
@@ -510,7 +765,7 @@ class MESH_OT_test_generation(bpy.types.Operator):
     def execute(self, context):
         test_prompt = "Generate an intelligent looking man with sharp features"   # Change to test female: "Generate an intelligent looking woman"
         analysis = smart_prompt_analysis(test_prompt)
-        gender = analysis.get("gender", DEFAULT_GENDER)
+        gender = analysis.gender
         if gender == "female":
             char_name = "mb_female"
         else:
@@ -527,11 +782,15 @@ def register():
     bpy.utils.register_class(MESH_OT_start_bridge)
     bpy.utils.register_class(MESH_OT_stop_bridge)
     bpy.utils.register_class(MESH_OT_test_generation)
+    if _clear_scene_caches not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_clear_scene_caches)
 def unregister():
     bpy.utils.unregister_class(MESH_PT_character_bridge)
     bpy.utils.unregister_class(MESH_OT_start_bridge)
     bpy.utils.unregister_class(MESH_OT_stop_bridge)
     bpy.utils.unregister_class(MESH_OT_test_generation)
+    if _clear_scene_caches in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_clear_scene_caches)
 # Register classes
 register()
 # =============================================================================
@@ -549,6 +808,9 @@ print("4. Enter character descriptions and generate!")
 # MAIN EXECUTION FOR TESTING
 # =============================================================================
 if __name__ == "__main__":
+    # Show the per-request log lines when run by hand
+    logging.basicConfig(level=logging.INFO)
+    
     # Test with various intelligent prompts
     test_prompts = [
         "generate an image of an intelligent looking man",
@@ -562,7 +824,7 @@ if __name__ == "__main__":
     user_prompt = test_prompts[0]
     
     analysis = smart_prompt_analysis(user_prompt)
-    gender = analysis.get("gender", DEFAULT_GENDER)
+    gender = analysis.gender
     if gender == "female":
         char_name = "mb_female"
     else:
@@ -571,4 +833,4 @@ if __name__ == "__main__":
     if character:
         process_and_apply_smart_prompt(user_prompt, character)
     else:
-        print(f"Error: Could not find character object for {gender}.")
+        logger.error("Could not find character object for %s.", gender)
@@ -14,27 +14,22 @@ bridge_script_path = current_dir / "blender_bridge.py"
 
 # 2. Add the script directory to the Blender Python path for importing
 if str(current_dir) not in sys.path:
-    sys.path.append(str(current_dir))
+    sys.path.insert(0, str(current_dir))
 
 print(f"Blender Startup: Loading bridge script from {bridge_script_path}")
 
-# 3. Load and execute the bridge script logic
+# 3. Import the bridge module and start it. A regular import (unlike exec of the
+# source) reuses the cached bytecode in __pycache__ on later launches, and gives
+# tracebacks real file/line information
 try:
     if not bridge_script_path.exists():
         raise FileNotFoundError(f"blender_bridge.py not found at {bridge_script_path}")
 
-    # Read and execute the blender_bridge.py content
-    with open(bridge_script_path, 'r') as f:
-        # Use exec to run the script contents, defining functions like start_bridge_monitoring
-        exec(f.read())
-    
-    # Check if the main monitoring function was successfully defined
-    if 'start_bridge_monitoring' in locals():
-        # Call the function to start the timer loop within Blender
-        start_bridge_monitoring()
-        print("=== BLENDER BRIDGE AUTO-STARTED SUCCESSFULLY ===")
-    else:
-        print("Error: start_bridge_monitoring function not found after execution.")
+    import blender_bridge
+
+    # Call the function to start the socket server and timer loop within Blender
+    blender_bridge.start_bridge_monitoring()
+    print("=== BLENDER BRIDGE AUTO-STARTED SUCCESSFULLY ===")
 
 except Exception as e:
     # This catches errors that occur during the loading of blender_bridge.py
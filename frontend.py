@@ -2,23 +2,27 @@ from flask import Flask, render_template, request, jsonify
 import json
 import os
 import time
+import socket
 import subprocess
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError: # orjson is optional; stdlib json handles the same payloads
+    orjson = None
+
 app = Flask(__name__)
 
 # =============================================================================
 # CONFIGURATION - UPDATE THESE PATHS FOR YOUR SETUP
 # =============================================================================
 
-# Communication directory
-COMMUNICATION_DIR = os.path.join(os.getcwd(), "blender_bridge")
-
-REQUEST_FILE = os.path.join(COMMUNICATION_DIR, "character_request.json")
-RESPONSE_FILE = os.path.join(COMMUNICATION_DIR, "character_response.json")
-BLENDER_STATUS_FILE = os.path.join(COMMUNICATION_DIR, "blender_status.json")
+# Blender bridge socket (must match BRIDGE_HOST/BRIDGE_PORT in blender_bridge.py)
+BRIDGE_HOST = "127.0.0.1"
+BRIDGE_PORT = 5055
 
 # Blender configuration
 # >>> VERIFY AND UPDATE THIS PATH! <<<
@@ -33,12 +37,78 @@ BLENDER_STARTUP_SCRIPT = os.path.join(os.getcwd(), "blender_startup.py")
 # Bridge script path (for reference only, the startup script uses it)
 BRIDGE_SCRIPT_PATH = os.path.join(os.getcwd(), "blender_bridge.py")
 
+# Blender's console output goes here; an unread pipe would fill up and stall Blender
+BLENDER_LOG_FILE = os.path.join(os.getcwd(), "blender.log")
+
+# The configured paths don't change while the server runs, so resolve and
+# stat them once; refresh_path_checks() re-stats them on /reset-status
+_MODEL_ABS = os.path.abspath(MODEL_BLEND_FILE)
+_STARTUP_SCRIPT_ABS = os.path.abspath(BLENDER_STARTUP_SCRIPT)
+_MODEL_EXISTS = False
+_BLENDER_EXISTS = False
+_STARTUP_SCRIPT_EXISTS = False
+
+def refresh_path_checks():
+    """Re-check that the model file, Blender executable and startup script exist."""
+    global _MODEL_EXISTS, _BLENDER_EXISTS, _STARTUP_SCRIPT_EXISTS
+    _MODEL_EXISTS = os.path.exists(_MODEL_ABS)
+    _BLENDER_EXISTS = os.path.exists(BLENDER_EXECUTABLE)
+    _STARTUP_SCRIPT_EXISTS = os.path.exists(_STARTUP_SCRIPT_ABS)
+
+refresh_path_checks()
+
 # Global state tracking
 blender_started_once = False
 last_successful_generation = None
 
-# Ensure communication directory exists
-os.makedirs(COMMUNICATION_DIR, exist_ok=True)
+# Persistent connection to the Blender bridge; the lock keeps concurrent
+# Flask requests from interleaving messages on it
+bridge_lock = threading.Lock()
+bridge_socket = None
+bridge_stream = None
+
+# Last /status payload; the UI polls it, and each fresh answer costs a bridge round trip
+STATUS_CACHE_TTL = 1.0 # seconds
+_status_cache = {"time": 0.0, "payload": None}
+
+# =============================================================================
+# BLENDER BRIDGE CONNECTION
+# =============================================================================
+
+def close_bridge_connection():
+    """Drop the bridge connection so the next request reconnects. Caller holds bridge_lock."""
+    global bridge_socket, bridge_stream
+    if bridge_stream is not None:
+        bridge_stream.close()
+    if bridge_socket is not None:
+        bridge_socket.close()
+    bridge_socket = None
+    bridge_stream = None
+
+def send_bridge_request(request_data, timeout):
+    """Send one request to the Blender bridge and block until its response arrives."""
+    global bridge_socket, bridge_stream
+    
+    with bridge_lock:
+        try:
+            if bridge_socket is None:
+                bridge_socket = socket.create_connection((BRIDGE_HOST, BRIDGE_PORT), timeout=timeout)
+                bridge_stream = bridge_socket.makefile('rb')
+            bridge_socket.settimeout(timeout)
+            payload = orjson.dumps(request_data) if orjson is not None else json.dumps(request_data).encode()
+            bridge_socket.sendall(payload + b"\n")
+            line = bridge_stream.readline()
+        except OSError:
+            # A late reply would be mistaken for the next request's, so start over
+            close_bridge_connection()
+            raise
+        
+        if not line:
+            close_bridge_connection()
+            raise ConnectionError("Blender closed the bridge connection.")
+    
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+    return orjson.loads(line) if orjson is not None else json.loads(line)
 
 # =============================================================================
 # BLENDER MANAGEMENT FUNCTIONS
@@ -46,37 +116,20 @@ os.makedirs(COMMUNICATION_DIR, exist_ok=True)
 
 def is_blender_responsive():
     """Check if Blender can respond to requests (more lenient check)."""
-    global last_successful_generation
-    
     if not blender_started_once:
         return False
     
     try:
-        # Check if a response file exists from a previous request
-        if os.path.exists(RESPONSE_FILE):
-            return True
-
         # Send a quick test request
         test_request = {
             "timestamp": datetime.now().isoformat(),
             "prompt": "__STATUS_CHECK__",
             "status": "pending"
         }
-        
-        with open(REQUEST_FILE, 'w') as f:
-            json.dump(test_request, f)
-        
-        start_time = time.time()
-        while time.time() - start_time < 3: # 3 second timeout
-            if os.path.exists(RESPONSE_FILE):
-                os.remove(RESPONSE_FILE)
-                return True
-            time.sleep(0.1)
-        
-        if os.path.exists(REQUEST_FILE):
-            os.remove(REQUEST_FILE)
+        send_bridge_request(test_request, timeout=3) # 3 second timeout
+        return True
             
-    except Exception as e:
+    except (OSError, ValueError) as e:
         print(f"Error checking Blender responsiveness: {e}")
     
     return False
@@ -85,14 +138,17 @@ def start_blender_with_model():
     """Start Blender in the background without creating a visible console window."""
     global blender_started_once
 
-    model_path = os.path.abspath(MODEL_BLEND_FILE)
-    startup_script_path = os.path.abspath(BLENDER_STARTUP_SCRIPT)
+    model_path = _MODEL_ABS
+    startup_script_path = _STARTUP_SCRIPT_ABS
 
-    if not os.path.exists(model_path):
+    # A cached miss may be stale if the user has since fixed the setup
+    if not (_MODEL_EXISTS and _BLENDER_EXISTS and _STARTUP_SCRIPT_EXISTS):
+        refresh_path_checks()
+    if not _MODEL_EXISTS:
         return {"success": False, "error": f"Model file not found: {model_path}"}
-    if not os.path.exists(BLENDER_EXECUTABLE):
+    if not _BLENDER_EXISTS:
         return {"success": False, "error": f"Blender executable not found: {BLENDER_EXECUTABLE}"}
-    if not os.path.exists(startup_script_path):
+    if not _STARTUP_SCRIPT_EXISTS:
         return {"success": False, "error": f"Static startup script not found: {startup_script_path}. Please ensure 'blender_startup.py' exists."}
 
     # === WINDOWS SPECIFIC SETUP TO HIDE CONSOLE ===
@@ -124,20 +180,25 @@ def start_blender_with_model():
             "--background",
         ]
 
-        print(f"Starting Blender with command: {' '.join(cmd)}")
+        if app.debug:
+            print(f"Starting Blender with command: {' '.join(cmd)}")
 
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            startupinfo=startupinfo,
-            creationflags=0
-        )
+        with open(BLENDER_LOG_FILE, 'ab') as log_file:
+            log_start = log_file.tell()
+            process = subprocess.Popen(
+                cmd,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                startupinfo=startupinfo,
+                creationflags=0
+            )
 
         time.sleep(5) # Increased sleep to give Blender time to truly settle or crash
         if process.poll() is not None:
-            stdout, stderr = process.communicate()
-            return {"success": False, "error": f"Blender process terminated immediately. Check Blender's security settings for running scripts. STDOUT: {stdout.decode()} STDERR: {stderr.decode()}"}
+            with open(BLENDER_LOG_FILE, 'rb') as log_file:
+                log_file.seek(log_start)
+                output = log_file.read().decode(errors='replace')
+            return {"success": False, "error": f"Blender process terminated immediately. Check Blender's security settings for running scripts. OUTPUT: {output}"}
 
         blender_started_once = True
 
@@ -163,6 +224,7 @@ def start_blender():
         return jsonify({"success": True, "message": "Blender is already running and responsive!"})
     
     result = start_blender_with_model()
+    _status_cache["payload"] = None
     return jsonify(result) if result["success"] else (jsonify(result), 500)
 
 @app.route('/generate', methods=['POST'])
@@ -180,86 +242,148 @@ def generate_character():
                 "error": "Please start Blender first using the 'Start Blender' button."
             }), 400
         
-        if os.path.exists(REQUEST_FILE):
-            os.remove(REQUEST_FILE)
-            time.sleep(0.1)
-
         request_data = {
             "timestamp": datetime.now().isoformat(),
             "prompt": prompt,
             "status": "pending"
         }
         
-        with open(REQUEST_FILE, 'w') as f:
-            json.dump(request_data, f)
+        try:
+            response_data = send_bridge_request(request_data, timeout=30)
+        except socket.timeout:
+            return jsonify({
+                "error": "Timeout waiting for Blender response. Blender might be busy or closed."
+            }), 408
+        except OSError as e:
+            return jsonify({
+                "error": f"Could not reach the Blender bridge: {e}"
+            }), 503
+        except json.JSONDecodeError:
+            return jsonify({
+                "success": False,
+                "error": "Failed to parse Blender's response. It may be corrupted."
+            }), 500
         
-        timeout = 30
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            if os.path.exists(RESPONSE_FILE):
-                try:
-                    with open(RESPONSE_FILE, 'r') as f:
-                        response_data = json.load(f)
-                    
-                    os.remove(RESPONSE_FILE)
-                    last_successful_generation = datetime.now()
-                    
-                    return jsonify({
-                        "success": True,
-                        "message": "Character generated successfully!",
-                        "details": response_data
-                    })
-                except json.JSONDecodeError:
-                    return jsonify({
-                        "success": False,
-                        "error": "Failed to parse Blender's response file. It may be corrupted."
-                    }), 500
-            
-            time.sleep(0.5)
+        last_successful_generation = datetime.now()
         
         return jsonify({
-            "error": "Timeout waiting for Blender response. Blender might be busy or closed."
-        }), 408
+            "success": True,
+            "message": "Character generated successfully!",
+            "details": response_data
+        })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate-batch', methods=['POST'])
+def generate_batch():
+    global last_successful_generation
+
+    try:
+        prompts = request.json.get('prompts', [])
+        incremental = bool(request.json.get('incremental', False))
+
+        if not isinstance(prompts, list) or not prompts:
+            return jsonify({"error": "No prompts provided"}), 400
+        if not all(isinstance(prompt, str) and prompt for prompt in prompts):
+            return jsonify({"error": "Every prompt must be a non-empty string"}), 400
+
+        if not blender_started_once:
+            return jsonify({
+                "error": "Please start Blender first using the 'Start Blender' button."
+            }), 400
+
+        # One message for the whole batch; the bridge runs every prompt in a single pass
+        request_data = {
+            "timestamp": datetime.now().isoformat(),
+            "batch": prompts,
+            "incremental": incremental,
+            "status": "pending"
+        }
+
+        try:
+            response_data = send_bridge_request(request_data, timeout=30 + 2 * len(prompts))
+        except socket.timeout:
+            return jsonify({
+                "error": "Timeout waiting for Blender response. Blender might be busy or closed."
+            }), 408
+        except OSError as e:
+            return jsonify({
+                "error": f"Could not reach the Blender bridge: {e}"
+            }), 503
+        except json.JSONDecodeError:
+            return jsonify({
+                "success": False,
+                "error": "Failed to parse Blender's response. It may be corrupted."
+            }), 500
+
+        # The bridge answers with a bare error (no "results") if the whole batch failed
+        if response_data.get("status") == "error" or "results" not in response_data:
+            return jsonify({
+                "success": False,
+                "error": response_data.get("message", "Blender returned no batch results."),
+                "details": response_data
+            }), 500
+
+        results = response_data["results"]
+        completed = sum(1 for result in results if result.get("status") == "completed")
+        if completed:
+            last_successful_generation = datetime.now()
+
+        return jsonify({
+            "success": completed == len(prompts),
+            "message": f"Generated {completed} of {len(prompts)} characters.",
+            "results": results
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/status')
 def status():
-    return jsonify({
+    now = time.monotonic()
+    if _status_cache["payload"] is not None and now - _status_cache["time"] < STATUS_CACHE_TTL:
+        return jsonify(_status_cache["payload"])
+    
+    payload = {
         "blender_running": is_blender_responsive(),
         "blender_started_once": blender_started_once,
-        "model_file": os.path.abspath(MODEL_BLEND_FILE),
-        "model_exists": os.path.exists(MODEL_BLEND_FILE),
+        "model_file": _MODEL_ABS,
+        "model_exists": _MODEL_EXISTS,
         "blender_executable": BLENDER_EXECUTABLE,
-        "blender_exists": os.path.exists(BLENDER_EXECUTABLE),
+        "blender_exists": _BLENDER_EXISTS,
         "timestamp": datetime.now().isoformat()
-    })
+    }
+    _status_cache.update(time=now, payload=payload)
+    return jsonify(payload)
 
 @app.route('/reset-status', methods=['POST'])
 def reset_status():
     global blender_started_once, last_successful_generation
     blender_started_once = False
     last_successful_generation = None
-    if os.path.exists(REQUEST_FILE): os.remove(REQUEST_FILE)
-    if os.path.exists(RESPONSE_FILE): os.remove(RESPONSE_FILE)
+    with bridge_lock:
+        close_bridge_connection()
+    refresh_path_checks()
+    _status_cache["payload"] = None
     return jsonify({"success": True, "message": "Status reset. You can now start Blender again."})
 
 @app.route('/config')
 def config():
     return jsonify({
-        "model_file": os.path.abspath(MODEL_BLEND_FILE),
+        "model_file": _MODEL_ABS,
         "blender_executable": BLENDER_EXECUTABLE,
-        "communication_dir": os.path.abspath(COMMUNICATION_DIR)
+        "bridge_address": f"{BRIDGE_HOST}:{BRIDGE_PORT}"
     })
 
 if __name__ == '__main__':
     print("🎭 Character Generator Frontend Starting...")
-    print(f"📁 Communication directory: {os.path.abspath(COMMUNICATION_DIR)}")
-    print(f"🎨 Model file: {os.path.abspath(MODEL_BLEND_FILE)}")
+    print(f"🔌 Blender bridge: {BRIDGE_HOST}:{BRIDGE_PORT}")
+    print(f"🎨 Model file: {_MODEL_ABS}")
     print(f"🔧 Blender executable: {BLENDER_EXECUTABLE}")
     print("🌐 Open http://127.0.0.1:5000 in your browser")
     print("🚀 Click 'Start Blender' once, then generate as many characters as you want!")
     
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    # The interactive debugger is opt-in via FLASK_DEBUG=1. The reloader stays off: it would
+    # run a second copy of the server with its own blender_started_once state
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", use_reloader=False, host='127.0.0.1', port=5000)